@@ -6,7 +6,7 @@ import logging
 import re
 import os
 import tempfile
-import base64
+import binascii
 import asyncio
 from dataclasses import dataclass
 from pathlib import Path
@@ -148,7 +148,8 @@ async def transcribe_voice(file_path: str) -> str:
 def image_to_base64(file_path: str) -> str:
     """Convert image file to base64 string."""
     with open(file_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+        # Photos run to megabytes: encode straight to one line, output is pure ASCII
+        return binascii.b2a_base64(image_file.read(), newline=False).decode('ascii')
 
 
 def _derive_attachment_name(caption: str, vision_text: str) -> str:
@@ -130,6 +130,29 @@ def get_history(user_id: int, limit: int = HISTORY_LIMIT) -> list[dict]:
     return [{"role": r[0], "content": r[1]} for r in reversed(rows)]
 
 
+def get_history_lines(
+    user_id: int,
+    limit: int = HISTORY_LIMIT,
+    user_label: str = "User",
+    bot_label: str = "Bot",
+    max_chars: int = 200,
+) -> list[str]:
+    """
+    Get conversation history as ready-to-print "<label>: <content>" lines (oldest first).
+    Formatting and truncation happen in SQLite, so no per-row dicts are built.
+    """
+    conn = get_connection()
+    rows = conn.execute(
+        """
+        SELECT CASE role WHEN 'user' THEN ? ELSE ? END || ': ' || substr(IFNULL(content, ''), 1, ?)
+        FROM messages WHERE user_id = ? ORDER BY id DESC LIMIT ?
+        """,
+        (user_label, bot_label, max_chars, user_id, limit),
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in reversed(rows)]
+
+
 def clear_history(user_id: int):
     """Clear conversation history for a user/chat."""
     conn = get_connection()
@@ -224,6 +247,43 @@ def get_recent_facts(limit: int = 10) -> list[dict]:
     return [{"content": r[0], "category": r[1], "timestamp": r[2]} for r in rows]
 
 
+# "[category] content (YYYY-MM-DD)" built by SQLite (date = timestamp up to 'T', '?' if missing)
+_FACT_LINE_SQL = (
+    "'[' || IFNULL(category, '') || '] ' || IFNULL(content, '') || ' (' || "
+    "CASE WHEN IFNULL(timestamp, '') = '' THEN '?' "
+    "ELSE substr(timestamp, 1, instr(timestamp || 'T', 'T') - 1) END || ')'"
+)
+
+
+def search_fact_lines(query: str, limit: int = 5) -> list[str]:
+    """Like search_facts, but returns ready-to-print lines formatted in SQL."""
+    conn = get_connection()
+    try:
+        rows = conn.execute(
+            f"SELECT {_FACT_LINE_SQL} FROM facts WHERE facts MATCH ? ORDER BY bm25(facts) LIMIT ?",
+            (query, limit),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # Fallback to LIKE if FTS fails
+        rows = conn.execute(
+            f"SELECT {_FACT_LINE_SQL} FROM facts WHERE content LIKE ? LIMIT ?",
+            (f"%{query}%", limit),
+        ).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
+def get_recent_fact_lines(limit: int = 10) -> list[str]:
+    """Like get_recent_facts, but returns ready-to-print lines formatted in SQL."""
+    conn = get_connection()
+    rows = conn.execute(
+        f"SELECT {_FACT_LINE_SQL} FROM facts ORDER BY timestamp DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    conn.close()
+    return [r[0] for r in rows]
+
+
 def get_all_facts_count() -> int:
     """Get total number of facts."""
     conn = get_connection()
@@ -3,17 +3,49 @@ LiteLLM connector — full-featured fallback with tools.
 """
 
 import asyncio
+import atexit
+import contextlib
 import contextvars
 import functools
 import json
 import logging
+import mmap
+import os
+import re
+import selectors
 import shlex
+import shutil
 import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
 from typing import Optional
 
-from config import PROJECT_DIR, WORKSPACE_DIR, ENABLE_LITELLM_TOOLS, LLM_TIMEOUT
+from config import (
+    PROJECT_DIR, WORKSPACE_DIR, DATA_DIR, CUSTOM_FACES_PATH, ENABLE_LITELLM_TOOLS, LLM_TIMEOUT,
+    DEFAULT_LITE_PRESET, LLM_PRESETS, GEMINI_API_BASE, get_admin_id,
+)
+from cron.scheduler import add_cron_job, list_cron_jobs, remove_cron_job
+from db.memory import add_fact, get_history_lines, search_fact_lines, get_recent_fact_lines
+from hardware.display import show_face as display_show_face
 from llm.base import LLMConnector, LLMError
+from llm.prompts import build_system_context
+from llm.rate_limits import clear_limit, record_rate_limit, should_auto_retry
+from memory.flush import write_to_daily_log
+from memory.vault import capture_note, read_vault_file, list_vault, search_vault
+from skills.loader import get_skill_content, search_skill_catalog, list_all_skill_names, get_eligible_skills
+from utils.doctor import run_checks as run_doctor_checks
+
+try:
+    import orjson  # Optional: faster JSON codec, stdlib json is the fallback
+except ImportError:
+    orjson = None
 
 log = logging.getLogger(__name__)
 
@@ -33,6 +65,20 @@ def _get_cron_target_chat_id() -> Optional[int]:
     return _cron_target_chat_id.get()
 
 
+def _json_loads(data: str | bytes):
+    """Parse JSON with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps_pretty(obj) -> bytes:
+    """Serialize to indented UTF-8 JSON bytes (non-ASCII kept as-is)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
 # Note: LiteLLM is imported lazily inside LiteLLMConnector.call to save RAM on Pi Zero 2W.
 LITELLM_AVAILABLE = True # Assume available, will fail at runtime if not
 
@@ -63,40 +109,52 @@ BLOCKED_EXECUTABLES = {"sudo", "su", "doas"}
 SHELL_INTERPRETERS = {"sh", "bash", "zsh", "fish", "dash"}
 
 # Protected files (cannot be written/deleted)
-PROTECTED_FILES = [
+PROTECTED_FILES = (
     ".env",
     "gotchi.db",
     "src/drivers/",  # Hardware drivers
     "src/ui/",       # E-Ink UI (critical display stack)
     "src/ui/gotchi_ui.py",
-]
+)
 
 # Max file size for write (100KB)
 MAX_WRITE_SIZE = 100 * 1024
 
+# Files at least this big are read via mmap instead of read_text
+MMAP_READ_THRESHOLD = 16 * 1024
+
+# Bytes kept per stream from tool subprocesses (replies are cut to 4000 chars anyway)
+SUBPROCESS_OUTPUT_CAP = 16 * 1024
+
+# Content at least this long (chars) is encoded in slices and written with writev
+WRITEV_CHUNK = 64 * 1024
+
+
+# All dangerous substrings folded into one case-insensitive pattern (one C-level scan)
+_DANGEROUS_RE = re.compile("|".join(map(re.escape, DANGEROUS_COMMANDS)), re.IGNORECASE)
+
 
 def _is_dangerous_command(cmd: str) -> bool:
     """Check if command is dangerous."""
-    cmd_lower = cmd.lower().strip()
-    for danger in DANGEROUS_COMMANDS:
-        if danger.lower() in cmd_lower:
-            return True
-    return False
+    return _DANGEROUS_RE.search(cmd) is not None
+
+
+# Protected substrings folded into one pattern, same as _DANGEROUS_RE
+_PROTECTED_RE = re.compile("|".join(map(re.escape, PROTECTED_FILES)))
 
 
 def _is_protected_path(path: Path) -> bool:
     """Check if path is protected from writes."""
-    path_str = str(path)
-    for protected in PROTECTED_FILES:
-        if protected in path_str:
-            return True
-    return False
+    return _PROTECTED_RE.search(str(path)) is not None
 
 
 def _sanitize_string(s: str, max_len: int = 10000) -> str:
     """Sanitize and limit string length."""
     if s is None:
         return ""
+    # Fast path: already a str under the cap — return as-is, no copy
+    if type(s) is str:
+        return s if len(s) <= max_len else s[:max_len]
     return str(s)[:max_len]
 
 
@@ -126,6 +184,68 @@ def _parse_command_args(command: str) -> tuple[list[str], Optional[str]]:
     return args, None
 
 
+def _project_path(path: str, resolve: bool = False) -> Path:
+    """
+    Turn a tool's path argument into an absolute path (relative = under PROJECT_DIR).
+    Only resolve=True follows symlinks — needed before protected-path checks.
+    """
+    if not resolve:
+        return _normalized_project_path(path)
+    p = Path(path).expanduser()
+    if not p.is_absolute():
+        p = PROJECT_DIR / p
+    return p.resolve()
+
+
+@functools.lru_cache(maxsize=256)
+def _normalized_project_path(path: str) -> Path:
+    """Pure string work (no filesystem access), so safe to memoize; Paths are immutable."""
+    p = Path(path).expanduser()
+    if not p.is_absolute():
+        p = PROJECT_DIR / p
+    return Path(os.path.normpath(p))
+
+
+def _run_capped(args, timeout: float, cap: int = SUBPROCESS_OUTPUT_CAP, **popen_kwargs) -> tuple[str, str]:
+    """
+    Run a command, returning (stdout, stderr) each truncated to `cap` bytes.
+    Past the cap output is still drained (and dropped) until EOF, so memory stays
+    bounded without killing a verbose process half-way through its work.
+    Raises subprocess.TimeoutExpired like run().
+    """
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **popen_kwargs)
+    bufs = {proc.stdout: bytearray(), proc.stderr: bytearray()}
+    deadline = time.monotonic() + timeout
+    try:
+        with selectors.DefaultSelector() as sel:
+            for stream in bufs:
+                sel.register(stream, selectors.EVENT_READ)
+            while sel.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise subprocess.TimeoutExpired(args, timeout)
+                for key, _ in sel.select(remaining):
+                    chunk = os.read(key.fd, 8192)
+                    if not chunk:
+                        sel.unregister(key.fileobj)
+                        continue
+                    buf = bufs[key.fileobj]
+                    if len(buf) < cap:
+                        buf += chunk[:cap - len(buf)]
+        proc.wait(timeout=max(deadline - time.monotonic(), 0))
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        proc.stdout.close()
+        proc.stderr.close()
+    return (
+        bufs[proc.stdout].decode("utf-8", errors="replace"),
+        bufs[proc.stderr].decode("utf-8", errors="replace"),
+    )
+
+
 # ============================================================
 # TOOLS
 # ============================================================
@@ -133,7 +253,7 @@ def _parse_command_args(command: str) -> tuple[list[str], Optional[str]]:
 def execute_bash(command: str, timeout: int = 999) -> str:
     """Execute a simple command without shell features."""
     # Validate
-    if not command or not command.strip():
+    if not command or command.isspace():
         return "Error: Empty command"
     
     command = _sanitize_string(command, 1000)
@@ -151,15 +271,13 @@ def execute_bash(command: str, timeout: int = 999) -> str:
     timeout = min(timeout, 999)  # Max 16 minutes
     
     try:
-        result = subprocess.run(
-            args, shell=False, capture_output=True, text=True,
-            timeout=timeout, cwd=str(PROJECT_DIR)
-        )
+        stdout, stderr = _run_capped(args, timeout, cwd=str(PROJECT_DIR))
+        stdout, stderr = stdout.strip(), stderr.strip()
         output = ""
-        if result.stdout.strip():
-            output += result.stdout.strip() + "\n"
-        if result.stderr.strip():
-            output += f"[stderr] {result.stderr.strip()}\n"
+        if stdout:
+            output += stdout + "\n"
+        if stderr:
+            output += f"[stderr] {stderr}\n"
         if not output:
             output = "(no output)"
         return output[:4000]
@@ -171,28 +289,72 @@ def execute_bash(command: str, timeout: int = 999) -> str:
 
 def read_file(path: str) -> str:
     """Read a file."""
-    if not path or not path.strip():
+    if not path or path.isspace():
         return "Error: Empty path"
     
     try:
-        p = Path(path).expanduser()
-        if not p.is_absolute():
-            p = PROJECT_DIR / p
-        p = p.resolve()
+        # Read-only: lexical normalisation is enough, skip resolve()'s per-component lstat
+        p = _project_path(path)
         
-        if not p.exists():
+        # One stat answers both "exists?" and "how big?"
+        try:
+            size = os.stat(p).st_size
+        except (FileNotFoundError, NotADirectoryError):
             return f"File not found: {path}"
-        if p.stat().st_size > 100 * 1024:
+        if size > 100 * 1024:
             return "File too large (>100KB). Read in chunks or use execute_bash with head/tail."
-        
-        return p.read_text(encoding="utf-8", errors="ignore")
+
+        if size < MMAP_READ_THRESHOLD:
+            # Size is known: one unbuffered read, one decode (no TextIOWrapper chunking)
+            with open(p, "rb", buffering=0) as f:
+                return f.read().decode("utf-8", errors="ignore")
+
+        # Larger files: decode straight from the page cache, skip the read() buffer
+        with open(p, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return str(mm, encoding="utf-8", errors="ignore")
     except Exception as e:
         return f"Error: {e}"
 
 
+def _backup_file(src: Path, backup: str) -> None:
+    """Back up a file as a hardlink (no data copied), falling back to a real copy."""
+    try:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(backup)
+        os.link(src, backup)
+    except OSError:
+        # No hardlinks here (e.g. FAT, cross-device) — copy2 still uses sendfile
+        shutil.copy2(src, backup)
+
+
+def _write_text_fd(fd: int, content: str) -> None:
+    """
+    Write text to a raw fd as UTF-8. Large content is encoded in WRITEV_CHUNK
+    slices and handed to the kernel in one writev() — no content-sized bytes copy.
+    """
+    if len(content) < WRITEV_CHUNK or not hasattr(os, "writev"):
+        bufs = [content.encode("utf-8")]
+    else:
+        bufs = [
+            content[i:i + WRITEV_CHUNK].encode("utf-8")
+            for i in range(0, len(content), WRITEV_CHUNK)
+        ]
+    views = [memoryview(b) for b in bufs]
+    while views:
+        written = os.writev(fd, views) if len(views) > 1 else os.write(fd, views[0])
+        # Short write: drop the fully written buffers, trim the partial one
+        while views and written >= len(views[0]):
+            written -= len(views[0])
+            views.pop(0)
+        if views and written:
+            views[0] = views[0][written:]
+
+
 def write_file(path: str, content: str) -> str:
     """Write to a file (with backup)."""
-    if not path or not path.strip():
+    if not path or path.isspace():
         return "Error: Empty path"
     if content is None:
         return "Error: Content is None"
@@ -202,10 +364,7 @@ def write_file(path: str, content: str) -> str:
         return f"Error: Content too large ({len(content)} bytes). Max is {MAX_WRITE_SIZE}."
     
     try:
-        p = Path(path).expanduser()
-        if not p.is_absolute():
-            p = PROJECT_DIR / p
-        p = p.resolve()
+        p = _project_path(path, resolve=True)
         
         # Safety check
         if _is_protected_path(p):
@@ -213,14 +372,47 @@ def write_file(path: str, content: str) -> str:
         
         p.parent.mkdir(parents=True, exist_ok=True)
         
-        # Backup existing file
-        if p.exists():
-            import shutil
-            backup_path = p.with_suffix(p.suffix + ".bak")
-            shutil.copy2(p, backup_path)
+        # Backup existing file (an empty one has nothing worth restoring)
+        try:
+            existed = True
+            has_data = p.stat().st_size > 0
+        except FileNotFoundError:
+            existed = has_data = False
+        backup_path = f"{p}.bak"
+        if has_data:
+            _backup_file(p, backup_path)
             log.info(f"Backup created: {backup_path}")
+        elif existed:
+            # A .bak from an earlier write is not the state being replaced now —
+            # drop it so restore_from_backup cannot bring back older content
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(backup_path)
         
-        p.write_text(content, encoding="utf-8")
+        # Write a sibling file and rename it over the original: a hardlinked
+        # backup must keep pointing at the old inode, so never truncate in place
+        fd, tmp_path = tempfile.mkstemp(dir=str(p.parent), prefix=p.name + ".", suffix=".tmp")
+        try:
+            try:
+                _write_text_fd(fd, content)
+                # Data on disk before the rename — a power cut leaves old or new, never half
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            if existed:
+                shutil.copymode(p, tmp_path)
+            else:
+                os.chmod(tmp_path, 0o644)  # mkstemp creates 0600
+            os.replace(tmp_path, p)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            # The original was not replaced, so a hardlinked .bak is still the live
+            # file — any in-place edit would change the "backup" too. Drop it.
+            if has_data:
+                with contextlib.suppress(OSError):
+                    if os.path.samefile(backup_path, p):
+                        os.unlink(backup_path)
+            raise
         return f"✓ Wrote {len(content)} bytes to {path}"
     except Exception as e:
         return f"Error: {e}"
@@ -229,38 +421,63 @@ def write_file(path: str, content: str) -> str:
 def list_directory(path: str = ".") -> str:
     """List directory contents."""
     try:
-        p = Path(path).expanduser()
-        if not p.is_absolute():
-            p = PROJECT_DIR / p
-        p = p.resolve()
+        p = _project_path(path)
         
         if not p.exists():
             return f"Not found: {path}"
         if not p.is_dir():
             return f"Not a directory: {path}"
         
-        items = []
-        for item in sorted(p.iterdir()):
-            suffix = "/" if item.is_dir() else ""
-            items.append(f"  {item.name}{suffix}")
+        # scandir's DirEntry knows the file type from readdir — no stat() per entry
+        with os.scandir(p) as it:
+            entries = sorted((e.name, e.is_dir()) for e in it)
+        items = [f"  {name}{'/' if is_dir else ''}" for name, is_dir in entries]
         
         return f"{p}/\n" + "\n".join(items) if items else f"{p}/ (empty)"
     except Exception as e:
         return f"Error: {e}"
 
 
-def _get_all_moods() -> list[str]:
-    """Get all available moods (default + custom)."""
+# Moods offered when the UI face table cannot be imported
+FALLBACK_MOODS = (
+    "happy", "sad", "excited", "thinking", "love", "surprised",
+    "bored", "sleeping", "hacker", "angry", "crying", "proud",
+    "nervous", "confused", "mischievous", "cool", "wink", "dead",
+    "shock", "suspicious", "smug", "cheering", "celebrate",
+)
+
+# ((custom_faces.json mtime, size), sorted moods, mood set) — rebuilt when the file changes
+_moods_cache: Optional[tuple[tuple[int, int], list[str], frozenset[str]]] = None
+
+_FALLBACK_MOOD_INDEX = (list(FALLBACK_MOODS), frozenset(FALLBACK_MOODS))
+
+
+def _get_mood_index() -> tuple[list[str], frozenset[str]]:
+    """Get sorted moods plus a set for O(1) membership, cached on custom faces mtime/size."""
+    global _moods_cache
+    try:
+        st = CUSTOM_FACES_PATH.stat()
+        key = (st.st_mtime_ns, st.st_size)
+    except OSError:
+        key = (0, 0)
+    if _moods_cache is None or _moods_cache[0] != key:
+        moods = _load_moods()
+        if moods is None:
+            # Not cached — a transient import error must not stick for the whole process
+            return _FALLBACK_MOOD_INDEX
+        _moods_cache = (key, moods, frozenset(moods))
+    return _moods_cache[1], _moods_cache[2]
+
+
+def _load_moods() -> Optional[list[str]]:
+    """Load all moods from the UI face table (uncached). None if it can't be loaded."""
     try:
+        # Imported here: ui.gotchi_ui needs PIL, and the result is cached by mtime anyway
         from ui.gotchi_ui import _load_all_faces
         faces = _load_all_faces()
         return sorted(faces.keys())
     except Exception:
-        # Fallback to hardcoded list if import fails
-        return ["happy", "sad", "excited", "thinking", "love", "surprised", 
-                "bored", "sleeping", "hacker", "angry", "crying", "proud", 
-                "nervous", "confused", "mischievous", "cool", "wink", "dead", 
-                "shock", "suspicious", "smug", "cheering", "celebrate"]
+        return None
 
 
 def show_face(mood: str, text: str = "") -> str:
@@ -269,31 +486,54 @@ def show_face(mood: str, text: str = "") -> str:
         return "Error: mood is required"
     
     mood = mood.lower().strip()
-    valid_moods = _get_all_moods()
+    valid_moods, mood_set = _get_mood_index()
     
-    if mood not in valid_moods:
+    if mood not in mood_set:
         return f"Error: Unknown mood '{mood}'. Valid moods: {', '.join(valid_moods[:10])}... (total: {len(valid_moods)})"
     
     # Limit text length
     text = _sanitize_string(text, 60)
     
     try:
-        from hardware.display import show_face as _show_face
-        _show_face(mood, text, full_refresh=True)
+        display_show_face(mood, text, full_refresh=True)
         return f"✓ Displayed: {mood}" + (f" '{text}'" if text else "")
     except Exception as e:
         return f"Error: {e}"
 
 
 # Standard faces that cannot be overridden/replaced (from gotchi_ui.py)
-STANDARD_FACES = [
+STANDARD_FACES = frozenset([
     "happy", "happy2", "sad", "excited", "thinking", "love", "surprised", "grateful",
     "motivated", "bored", "sleeping", "sleeping_pwn", "awakening", "observing",
     "intense", "cool", "chill", "hype", "hacker", "smart", "broken", "debug",
     "angry", "crying", "proud", "nervous", "confused", "mischievous", "wink",
     "dead", "shock", "suspicious", "smug", "cheering", "celebrate", "dizzy",
     "lonely", "demotivated"
-]
+])
+
+# ((custom_faces.json mtime, size), name -> kaomoji, kaomoji -> name) — rebuilt when the file changes
+_custom_faces_cache: Optional[tuple[tuple[int, int], dict[str, str], dict[str, str]]] = None
+
+
+def _get_custom_faces() -> tuple[dict[str, str], dict[str, str]]:
+    """Get custom faces by name and by kaomoji, cached on custom faces mtime/size."""
+    global _custom_faces_cache
+    try:
+        st = CUSTOM_FACES_PATH.stat()
+    except OSError:
+        return {}, {}
+    key = (st.st_mtime_ns, st.st_size)
+    if _custom_faces_cache is None or _custom_faces_cache[0] != key:
+        try:
+            by_name = _json_loads(CUSTOM_FACES_PATH.read_bytes())
+        except Exception:
+            by_name = {}
+        # First name wins for a duplicated kaomoji, as the old linear scan did
+        by_kao = {}
+        for face_name, face_kaomoji in by_name.items():
+            by_kao.setdefault(face_kaomoji, face_name)
+        _custom_faces_cache = (key, by_name, by_kao)
+    return _custom_faces_cache[1], _custom_faces_cache[2]
 
 def add_custom_face(name: str, kaomoji: str) -> str:
     """
@@ -315,37 +555,29 @@ def add_custom_face(name: str, kaomoji: str) -> str:
         return f"Error: '{name}' is a standard system face. Please pick a new unique name for your custom face."
     
     try:
-        from config import CUSTOM_FACES_PATH, DATA_DIR
-        import json
-        
         # Ensure data/ exists
         DATA_DIR.mkdir(exist_ok=True)
         
-        # Load existing custom faces
-        custom_faces = {}
-        if CUSTOM_FACES_PATH.exists():
-            try:
-                custom_faces = json.loads(CUSTOM_FACES_PATH.read_text())
-            except Exception:
-                pass
+        # Load existing custom faces (cached until the file changes)
+        custom_faces, faces_by_kaomoji = _get_custom_faces()
         
         # 1. Check if name already exists in custom
-        if name in custom_faces:
-             current = custom_faces[name]
+        current = custom_faces.get(name)
+        if current is not None:
              if current == kaomoji:
                  return f"Note: Custom face '{name}' already exists with this exact kaomoji {kaomoji}. No changes needed."
              return f"Error: Custom face '{name}' already exists with a different kaomoji: {current}. If you want to change it, first explain why, or use a new name."
 
         # 2. Check if this exact kaomoji already exists under another name
-        for existing_name, existing_kaomoji in custom_faces.items():
-            if existing_kaomoji == kaomoji:
-                return f"Error: This kaomoji {kaomoji} is already registered as '{existing_name}'. Please use the existing name instead of creating a duplicate."
+        existing_name = faces_by_kaomoji.get(kaomoji)
+        if existing_name is not None:
+            return f"Error: This kaomoji {kaomoji} is already registered as '{existing_name}'. Please use the existing name instead of creating a duplicate."
 
-        # Add new face
-        custom_faces[name] = kaomoji
+        # Add new face (copy — the cached dict is shared)
+        custom_faces = {**custom_faces, name: kaomoji}
         
         # Save
-        CUSTOM_FACES_PATH.write_text(json.dumps(custom_faces, indent=2, ensure_ascii=False))
+        CUSTOM_FACES_PATH.write_bytes(_json_dumps_pretty(custom_faces))
         
         return f"✓ Added custom face '{name}': {kaomoji}. Now you can use FACE: {name} in your replies."
     except Exception as e:
@@ -362,7 +594,6 @@ def remember_fact(category: str, fact: str) -> str:
     fact = _sanitize_string(fact, 500)
     
     try:
-        from db.memory import add_fact
         add_fact(fact, category)
         return f"✓ Remembered [{category}]: {fact}"
     except Exception as e:
@@ -372,28 +603,18 @@ def remember_fact(category: str, fact: str) -> str:
 def recall_facts(query: str = "", limit: int = 10) -> str:
     """Search long-term memory — delegates to db/memory.py."""
     try:
-        from db.memory import search_facts, get_recent_facts
-        
         if query:
-            facts = search_facts(query, limit)
+            lines = search_fact_lines(query, limit)
         else:
-            facts = get_recent_facts(limit)
+            lines = get_recent_fact_lines(limit)
         
-        if not facts:
-            return "No facts found"
-        
-        result = []
-        for f in facts:
-            date = f['timestamp'].split("T")[0] if f.get('timestamp') else "?"
-            result.append(f"[{f['category']}] {f['content']} ({date})")
-        return "\n".join(result)
+        return "\n".join(lines) or "No facts found"
     except Exception as e:
         return f"Error: {e}"
 
 
 def read_skill(skill_name: str) -> str:
     """Read a skill's SKILL.md (works for both gotchi-skills and openclaw-skills)."""
-    from skills.loader import get_skill_content
     return get_skill_content(skill_name)
 
 
@@ -404,13 +625,11 @@ def search_skills(query: str) -> str:
     
     Example queries: "weather", "email", "notes", "music", "calendar"
     """
-    from skills.loader import search_skill_catalog
     return search_skill_catalog(query)
 
 
 def list_skills() -> str:
     """List all available skill names (both active and reference)."""
-    from skills.loader import list_all_skill_names, get_eligible_skills
     
     active = get_eligible_skills()
     active_names = {s.name for s in active}
@@ -441,49 +660,56 @@ def restart_self() -> str:
         return f"Error: {e}"
 
 
-def check_syntax(file_path: str) -> str:
-    """Check Python file syntax before restart. ALWAYS use this after modifying code!"""
+def _check_py_syntax(p: Path, label: str) -> str:
+    """Compile an already-absolute path; `label` is how the file is named in the reply."""
     try:
-        p = Path(file_path).expanduser()
-        if not p.is_absolute():
-            p = PROJECT_DIR / p
-        
         if not p.exists():
-            return f"File not found: {file_path}"
+            return f"File not found: {label}"
         
         if not p.suffix == ".py":
-            return f"Not a Python file: {file_path}"
+            return f"Not a Python file: {label}"
         
-        result = subprocess.run(
-            ["python3", "-m", "py_compile", str(p)],
-            capture_output=True, text=True, timeout=10
-        )
-        
-        if result.returncode == 0:
-            return f"✓ Syntax OK: {file_path}"
-        else:
-            return f"✗ Syntax ERROR in {file_path}:\n{result.stderr}"
+        # Compile in-process — no need to fork a whole interpreter for this
+        try:
+            compile(p.read_bytes(), str(p), "exec", dont_inherit=True)
+        except SyntaxError as e:
+            where = f"line {e.lineno}: " if e.lineno else ""  # no line for e.g. null bytes
+            return f"✗ Syntax ERROR in {label}:\n  {where}{e.msg}"
+        except ValueError as e:  # null bytes on older Pythons
+            return f"✗ Syntax ERROR in {label}:\n  {e}"
+        return f"✓ Syntax OK: {label}"
     except Exception as e:
         return f"Error: {e}"
 
 
+def check_syntax(file_path: str) -> str:
+    """Check Python file syntax before restart. ALWAYS use this after modifying code!"""
+    try:
+        p = _project_path(file_path)
+    except Exception as e:
+        return f"Error: {e}"
+    return _check_py_syntax(p, file_path)
+
+
+# Files safe_restart must compile cleanly, joined onto PROJECT_DIR once
+_CRITICAL_PY_NAMES = (
+    "src/main.py",
+    "src/bot/handlers.py",
+    "src/llm/litellm_connector.py",
+    "src/llm/router.py",
+)
+_CRITICAL_PY_FILES = tuple(PROJECT_DIR / name for name in _CRITICAL_PY_NAMES)
+
+
 def safe_restart() -> str:
     """
     Check all critical files syntax, then restart if OK.
     Use this after code modifications!
     """
-    critical_files = [
-        "src/main.py",
-        "src/bot/handlers.py",
-        "src/llm/litellm_connector.py",
-        "src/llm/router.py",
-    ]
-    
-    errors = []
-    for f in critical_files:
-        result = check_syntax(f)
-        if "ERROR" in result:
-            errors.append(result)
+    # Checks are independent — run them side by side (file reads overlap)
+    with ThreadPoolExecutor(max_workers=len(_CRITICAL_PY_FILES)) as pool:
+        results = list(pool.map(_check_py_syntax, _CRITICAL_PY_FILES, _CRITICAL_PY_NAMES))
+    errors = [r for r in results if "ERROR" in r]
     
     if errors:
         return "❌ Cannot restart — syntax errors:\n\n" + "\n".join(errors)
@@ -495,7 +721,6 @@ def safe_restart() -> str:
 def write_daily_log(entry: str) -> str:
     """Write to today's daily log — delegates to memory/flush.py."""
     try:
-        from memory.flush import write_to_daily_log
         write_to_daily_log(entry)
         return f"Logged to daily log"
     except Exception as e:
@@ -509,23 +734,16 @@ def recall_messages(limit: int = 20) -> str:
     Returns the last N messages (user + assistant) for the current chat.
     """
     try:
-        from db.memory import get_history
-        from config import get_admin_id
-        
         # Use admin chat as default (most common case)
         chat_id = get_admin_id() or 0
-        history = get_history(chat_id, limit=min(limit, 50))
+        lines = get_history_lines(
+            chat_id, limit=min(limit, 50), user_label="👤 User", bot_label="🤖 Bot", max_chars=200
+        )
         
-        if not history:
+        if not lines:
             return "No messages found in history."
         
-        lines = [f"Last {len(history)} messages:"]
-        for msg in history:
-            role = "👤 User" if msg["role"] == "user" else "🤖 Bot"
-            content = msg["content"][:200]
-            lines.append(f"{role}: {content}")
-        
-        return "\n".join(lines)
+        return f"Last {len(lines)} messages:\n" + "\n".join(lines)
     except Exception as e:
         return f"Error reading messages: {e}"
 
@@ -533,7 +751,6 @@ def recall_messages(limit: int = 20) -> str:
 def add_scheduled_task(name: str, interval_minutes: int = 0, run_in_minutes: int = 0, run_in_seconds: int = 0, message: str = "") -> str:
     """Add a scheduled/cron task. Use run_in_seconds for short delays (e.g. 15), run_in_minutes for minutes."""
     try:
-        from cron.scheduler import add_cron_job
         target_chat = _get_cron_target_chat_id() or 0
         
         if run_in_seconds > 0:
@@ -572,7 +789,6 @@ def add_scheduled_task(name: str, interval_minutes: int = 0, run_in_minutes: int
 def list_scheduled_tasks() -> str:
     """List all scheduled tasks. Use job_id or task name with remove_scheduled_task to remove."""
     try:
-        from cron.scheduler import list_cron_jobs
         jobs = list_cron_jobs()
         
         if not jobs:
@@ -598,7 +814,6 @@ def list_scheduled_tasks() -> str:
 def remove_scheduled_task(job_id: str) -> str:
     """Remove a scheduled task by ID."""
     try:
-        from cron.scheduler import remove_cron_job
         if remove_cron_job(job_id):
             return f"Removed task: {job_id}"
         return f"Task not found: {job_id}"
@@ -612,41 +827,72 @@ def health_check() -> str:
     Checks: internet, disk, temp, service status, recent errors.
     """
     try:
-        result = subprocess.run(
-            ["python3", str(PROJECT_DIR / "src" / "utils" / "doctor.py")],
-            capture_output=True, text=True, timeout=30
-        )
-        return result.stdout + (f"\n{result.stderr}" if result.stderr else "")
+        # In-process: no second interpreter start-up per check
+        report, _ = run_doctor_checks()
+        return report
     except Exception as e:
         return f"Error running health check: {e}"
 
 
 # Max lines to keep in ERROR_LOG.md so we don't fill disk on Pi
 ERROR_LOG_MAX_LINES = 300
+# Let the log overshoot by this many lines before trimming, so rewrites are batched
+ERROR_LOG_TRIM_SLACK = 50
+
+_error_log_lines: Optional[int] = None  # Line count of ERROR_LOG.md, loaded on first use
+_error_log_lock = threading.Lock()  # Tools run in worker threads; count + append + trim go together
+
+
+def _count_lines(path: Path) -> int:
+    """Count newline-terminated lines in a file without holding it in memory."""
+    try:
+        with open(path, "rb") as f:
+            return sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(65536), b""))
+    except FileNotFoundError:
+        return 0
+
+
+def _trim_log_tail(path: Path, keep: int) -> None:
+    """
+    Keep only the last `keep` lines of a file. The tail is written to a sibling
+    temp file and renamed over the log, so a crash mid-trim can't truncate it.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        # Walk back over `keep` line ends to find where the tail starts
+        cut = len(mm) - 1 if mm[-1] == ord("\n") else len(mm)
+        for _ in range(keep):
+            cut = mm.rfind(b"\n", 0, cut)
+            if cut < 0:
+                return  # Fewer lines than `keep` — nothing to trim
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(mm[cut + 1:])
+    os.replace(tmp_path, path)
 
 
 def log_error(message: str) -> str:
     """
     Append a critical error to data/ERROR_LOG.md (timestamped).
     Use when: display failed, service down, health_check found problems, restart failed, or user reports something broken.
-    Keeps only last ERROR_LOG_MAX_LINES so disk doesn't fill. You can read_file('data/ERROR_LOG.md') to see recent errors.
+    Trims back to the last ERROR_LOG_MAX_LINES once ERROR_LOG_TRIM_SLACK more pile up, so disk doesn't fill. You can read_file('data/ERROR_LOG.md') to see recent errors.
     """
-    if not message or not message.strip():
+    if not message or message.isspace():
         return "Error: message required"
+    global _error_log_lines
     try:
-        from datetime import datetime
-        from config import DATA_DIR
         log_path = DATA_DIR / "ERROR_LOG.md"
         DATA_DIR.mkdir(parents=True, exist_ok=True)
         line = f"[{datetime.now().isoformat()}] ERROR: {message.strip()}\n"
-        with open(log_path, "a", encoding="utf-8") as f:
-            f.write(line)
-        # Trim to last N lines so log doesn't grow unbounded on Pi
-        with open(log_path, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        if len(lines) > ERROR_LOG_MAX_LINES:
-            with open(log_path, "w", encoding="utf-8") as f:
-                f.writelines(lines[-ERROR_LOG_MAX_LINES:])
+        with _error_log_lock:
+            if _error_log_lines is None:
+                _error_log_lines = _count_lines(log_path)
+            with open(log_path, "a", encoding="utf-8") as f:
+                f.write(line)
+            _error_log_lines += line.count("\n")
+            # Trim to last N lines so log doesn't grow unbounded on Pi
+            if _error_log_lines > ERROR_LOG_MAX_LINES + ERROR_LOG_TRIM_SLACK:
+                _trim_log_tail(log_path, ERROR_LOG_MAX_LINES)
+                _error_log_lines = ERROR_LOG_MAX_LINES
         return f"Logged to {log_path.name}"
     except Exception as e:
         return f"Error writing log: {e}"
@@ -665,14 +911,12 @@ def vault_write(
     links: Optional[list[str]] = None,
 ) -> str:
     """Write a note into the Obsidian vault."""
-    if not title or not title.strip():
+    if not title or title.isspace():
         return "Error: title required"
-    if not raw_text or not raw_text.strip():
+    if not raw_text or raw_text.isspace():
         raw_text = title
 
     try:
-        from memory.vault import capture_note
-
         result = capture_note(
             title=title.strip(),
             raw_text=raw_text.strip(),
@@ -697,10 +941,9 @@ def vault_write(
 
 def vault_read(path: str) -> str:
     """Read a file inside the vault."""
-    if not path or not path.strip():
+    if not path or path.isspace():
         return "Error: path required"
     try:
-        from memory.vault import read_vault_file
         return read_vault_file(path)
     except Exception as e:
         return f"Error reading vault file: {e}"
@@ -709,7 +952,6 @@ def vault_read(path: str) -> str:
 def vault_list(path: str = ".") -> str:
     """List files inside the vault."""
     try:
-        from memory.vault import list_vault
         return list_vault(path)
     except Exception as e:
         return f"Error listing vault: {e}"
@@ -717,10 +959,9 @@ def vault_list(path: str = ".") -> str:
 
 def vault_search(query: str, limit: int = 10) -> str:
     """Search the vault for prior notes."""
-    if not query or not query.strip():
+    if not query or query.isspace():
         return "Error: query required"
     try:
-        from memory.vault import search_vault
         return search_vault(query, limit)
     except Exception as e:
         return f"Error searching vault: {e}"
@@ -735,23 +976,116 @@ def restore_from_backup(file_path: str) -> str:
         return "Error: file_path required"
     
     try:
-        p = Path(file_path).expanduser()
-        if not p.is_absolute():
-            p = PROJECT_DIR / p
-        p = p.resolve()
-        
-        backup = p.with_suffix(p.suffix + ".bak")
+        p = _project_path(file_path, resolve=True)
+        backup = f"{p}.bak"
         
-        if not backup.exists():
+        if not os.path.exists(backup):
             return f"No backup found: {backup}"
         
-        import shutil
-        shutil.copy2(backup, p)
+        try:
+            shutil.copy2(backup, p)
+        except shutil.SameFileError:
+            # Backup is a hardlink to the live file: it already holds that content
+            return f"Nothing to restore: {file_path} is identical to its backup"
         return f"✓ Restored {file_path} from backup"
     except Exception as e:
         return f"Error: {e}"
 
 
+# Size, mtime and newest "## <date>" of .workspace/CHANGELOG.md as of our last write
+_changelog_state: Optional[tuple[int, int, Optional[str], Optional[str]]] = None
+
+# (fd, st_dev, st_ino) of the changelog kept open in O_APPEND mode across calls
+_changelog_handle: Optional[tuple[int, int, int]] = None
+_changelog_lock = threading.Lock()
+
+_CHANGELOG_SECTION_RE = re.compile(rb"^## (\S+)", re.MULTILINE)
+CHANGELOG_SCAN_CHUNK = 4096
+
+
+def _changelog_sections(path: Path, st: os.stat_result) -> tuple[Optional[str], Optional[str], bool]:
+    """
+    Return the (first, last) "## <date>" section names of the changelog, plus
+    whether it ends with a newline.
+    Reads forward from the start and backward from the end in chunks until a
+    header is found on each side (the whole file, at worst). Skipped entirely
+    if we were the last writer.
+    """
+    if _changelog_state and _changelog_state[:2] == (st.st_size, st.st_mtime_ns):
+        return _changelog_state[2], _changelog_state[3], True
+    size = st.st_size
+    first = last = None
+    with open(path, "rb") as f:
+        f.seek(size - 1)
+        ends_with_newline = f.read(1) == b"\n"
+        f.seek(0)
+        buf = b""
+        while len(buf) < size:
+            chunk = f.read(CHANGELOG_SCAN_CHUNK)
+            if not chunk:
+                break
+            buf += chunk
+            m = _CHANGELOG_SECTION_RE.search(buf)
+            # A match touching the buffer end may be a date cut in half — read on
+            if m and (m.end() < len(buf) or len(buf) >= size):
+                first = m.group(1).decode("utf-8", errors="ignore")
+                break
+        if first is None:
+            return None, None, ends_with_newline
+        buf, pos = b"", size
+        while pos > 0:
+            step = min(CHANGELOG_SCAN_CHUNK, pos)
+            pos -= step
+            f.seek(pos)
+            buf = f.read(step) + buf
+            # ^ also matches at the buffer start, which is only a line start at offset 0
+            starts = [m for m in _CHANGELOG_SECTION_RE.finditer(buf) if m.start() > 0 or pos == 0]
+            if starts:
+                last = starts[-1].group(1).decode("utf-8", errors="ignore")
+                break
+    return first, last, ends_with_newline
+
+
+def _insert_changelog_newest_first(path: Path, today: str, entry: str) -> None:
+    """Legacy newest-first changelog: add the entry under today's top section (rewrites the file)."""
+    content = path.read_text(encoding="utf-8")
+    if f"## {today}" in content:
+        content = content.replace(f"## {today}\n", f"## {today}\n{entry}", 1)
+    else:
+        idx = content.find("\n## ")
+        idx = 0 if content.startswith("## ") else idx + 1
+        content = f"{content[:idx]}## {today}\n{entry}\n{content[idx:]}"
+    # Same inode (truncate in place), so the long-lived append fd stays valid
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _changelog_fd(path: Path, st: Optional[os.stat_result]) -> int:
+    """
+    Return the open append fd for the changelog, reopening it if the file
+    was deleted or replaced (different inode) since we opened it.
+    """
+    global _changelog_handle
+    if _changelog_handle and st and (st.st_dev, st.st_ino) == _changelog_handle[1:]:
+        return _changelog_handle[0]
+    _close_changelog()
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    fst = os.fstat(fd)
+    _changelog_handle = (fd, fst.st_dev, fst.st_ino)
+    return fd
+
+
+def _close_changelog() -> None:
+    global _changelog_handle
+    if _changelog_handle:
+        with contextlib.suppress(OSError):
+            os.close(_changelog_handle[0])
+        _changelog_handle = None
+
+
+atexit.register(_close_changelog)
+
+
 def log_change(description: str) -> str:
     """
     Log a change to .workspace/CHANGELOG.md.
@@ -761,46 +1095,55 @@ def log_change(description: str) -> str:
     if not description:
         return "Error: description required"
     
+    global _changelog_state
     try:
-        from datetime import datetime
         changelog_path = WORKSPACE_DIR / "CHANGELOG.md"
         
         today = datetime.now().strftime("%Y-%m-%d")
         time_str = datetime.now().strftime("%H:%M")
-        entry = f"- [{time_str}] {description}"
+        entry = f"- [{time_str}] {description}\n"
         
-        if changelog_path.exists():
-            content = changelog_path.read_text()
-            # Check if today's section exists
-            if f"## {today}" in content:
-                # Append to today's section
-                content = content.replace(
-                    f"## {today}",
-                    f"## {today}\n{entry}",
-                    1
-                )
+        with _changelog_lock:
+            # Append-only: newest day section is at the bottom, so we never rewrite the file
+            try:
+                st = changelog_path.stat()
+            except FileNotFoundError:
+                st = None
+            if st is None or st.st_size == 0:
+                first = None
+                content = f"# Changelog\n\nAll notable self-modifications.\n\n## {today}\n{entry}"
             else:
-                # Add new day section at top (after header)
-                lines = content.split("\n")
-                header_end = 0
-                for i, line in enumerate(lines):
-                    if line.startswith("## "):
-                        header_end = i
-                        break
-                else:
-                    header_end = min(3, len(lines))
-                
-                lines.insert(header_end, f"\n## {today}\n{entry}\n")
-                content = "\n".join(lines)
-        else:
-            content = f"# Changelog\n\nAll notable self-modifications.\n\n## {today}\n{entry}\n"
-        
-        changelog_path.write_text(content)
+                first, last, ends_with_newline = _changelog_sections(changelog_path, st)
+                if first and last and first > last:
+                    # Older file written newest-first: keep its order
+                    _insert_changelog_newest_first(changelog_path, today, entry)
+                    _changelog_state = None
+                    return f"Logged: {description}"
+                content = entry if last == today else f"\n## {today}\n{entry}"
+                if not ends_with_newline:
+                    content = "\n" + content
+            
+            # One write() on a long-lived O_APPEND fd — no open/close per entry
+            fd = _changelog_fd(changelog_path, st)
+            os.write(fd, content.encode("utf-8"))
+            st = os.fstat(fd)
+            _changelog_state = (st.st_size, st.st_mtime_ns, first or today, today)
         return f"Logged: {description}"
     except Exception as e:
         return f"Error: {e}"
 
 
+# Destructive git operations (blocked)
+BLOCKED_GIT_COMMANDS = ["push --force", "push -f", "reset --hard HEAD~", "clean -fd"]
+_BLOCKED_GIT_RE = re.compile("|".join(map(re.escape, BLOCKED_GIT_COMMANDS)))
+
+# Read-only git subcommands run without optional locks, so e.g. `git status`
+# skips refreshing and rewriting the index on the Pi's SD card
+_GIT_READONLY_SUBCOMMANDS = frozenset({
+    "status", "log", "diff", "show", "branch", "rev-parse", "ls-files", "describe", "blame",
+})
+
+
 def git_command(command: str) -> str:
     """
     Run a git command in the project repository.
@@ -814,29 +1157,37 @@ def git_command(command: str) -> str:
         git_command("commit -m 'fix: heartbeat reflection'")
         git_command("diff --stat")
     """
-    if not command or not command.strip():
+    if not command or command.isspace():
         return "Error: command required (e.g. 'status', 'log --oneline -5')"
     
     command = command.strip()
     
     # Block destructive remote operations
-    blocked = ["push --force", "push -f", "reset --hard HEAD~", "clean -fd"]
-    for b in blocked:
-        if b in command:
-            return f"Error: '{b}' is blocked for safety. Ask the owner."
+    blocked = _BLOCKED_GIT_RE.search(command)
+    if blocked:
+        return f"Error: '{blocked.group()}' is blocked for safety. Ask the owner."
     
-    full_cmd = f"git {command}"
+    # argv list, no /bin/sh in between (and no shell expansion of the model's input)
+    try:
+        git_args = shlex.split(command)
+    except ValueError as e:
+        return f"Error: Invalid command syntax ({e})"
+    if not git_args:
+        return "Error: command required (e.g. 'status', 'log --oneline -5')"
+    
+    env = None
+    if git_args[0] in _GIT_READONLY_SUBCOMMANDS:
+        env = {**os.environ, "GIT_OPTIONAL_LOCKS": "0"}
     
     try:
-        result = subprocess.run(
-            full_cmd, shell=True, capture_output=True, text=True,
-            timeout=30, cwd=str(PROJECT_DIR)
-        )
+        # Only the capped head of a huge log/diff is kept; git itself still runs to completion
+        stdout, stderr = _run_capped(["git", *git_args], 30, cwd=str(PROJECT_DIR), env=env)
+        stdout, stderr = stdout.strip(), stderr.strip()
         output = ""
-        if result.stdout.strip():
-            output += result.stdout.strip()
-        if result.stderr.strip():
-            output += f"\n[stderr] {result.stderr.strip()}"
+        if stdout:
+            output += stdout
+        if stderr:
+            output += f"\n[stderr] {stderr}"
         return (output or "(no output)")[:4000]
     except subprocess.TimeoutExpired:
         return "Error: git command timed out"
@@ -863,13 +1214,14 @@ def manage_service(service: str, action: str = "status") -> str:
         return f"Error: Action '{action}' not allowed. Allowed: {', '.join(allowed_actions)}"
     
     try:
+        # Both values are whitelisted above, so the argv can be built directly
         if action == "logs":
-            cmd = f"journalctl -u {service} -n 30 --no-pager"
+            cmd = ["journalctl", "-u", service, "-n", "30", "--no-pager"]
         else:
-            cmd = f"sudo systemctl {action} {service}"
+            cmd = ["sudo", "systemctl", action, service]
         
         result = subprocess.run(
-            cmd, shell=True, capture_output=True, text=True, timeout=15
+            cmd, capture_output=True, text=True, timeout=15
         )
         output = (result.stdout + result.stderr).strip()
         return output or f"Service {service}: {action} done"
@@ -1119,12 +1471,48 @@ TOOL_MAP = {
 }
 
 
+# Tool names for the "Unknown tool" error, joined once
+_TOOL_NAMES_STR = ", ".join(TOOL_MAP)
+
+# Tool schemas by function name, in TOOLS order
+_TOOLS_BY_NAME: dict[str, dict] = {tool["function"]["name"]: tool for tool in TOOLS}
+
+# Per-tool (required, allowed) argument names, derived once from the TOOLS schemas
+_TOOL_ARG_SPECS: dict[str, tuple[frozenset[str], frozenset[str]]] = {
+    name: (
+        frozenset(tool["function"].get("parameters", {}).get("required", ())),
+        frozenset(tool["function"].get("parameters", {}).get("properties", {})),
+    )
+    for name, tool in _TOOLS_BY_NAME.items()
+}
+
+
+def _validate_tool_args(func_name: str, args: dict) -> Optional[str]:
+    """Check args against the tool's schema before dispatch. Returns an error message or None."""
+    spec = _TOOL_ARG_SPECS.get(func_name)
+    if spec is None:
+        return None
+    required, allowed = spec
+    missing = required.difference(args)
+    if missing:
+        return f"Error: Invalid arguments for {func_name}: missing required argument(s): {', '.join(sorted(missing))}"
+    unexpected = args.keys() - allowed
+    if unexpected:
+        return f"Error: Invalid arguments for {func_name}: unexpected argument(s): {', '.join(sorted(unexpected))}"
+    return None
+
+
 def _filter_tools(allowed_tool_names: Optional[list[str]] = None) -> list[dict]:
     """Return the tool list narrowed to the allowed names when provided."""
     if not allowed_tool_names:
         return TOOLS
-    allowed = set(allowed_tool_names)
-    return [tool for tool in TOOLS if tool.get("function", {}).get("name") in allowed]
+    return _tools_for(frozenset(allowed_tool_names))
+
+
+@functools.lru_cache(maxsize=16)
+def _tools_for(allowed: frozenset[str]) -> list[dict]:
+    """Narrowed tool list per allow-list — callers pass the same few lists every message. Do not mutate."""
+    return [tool for name, tool in _TOOLS_BY_NAME.items() if name in allowed]
 
 
 # ============================================================
@@ -1158,110 +1546,227 @@ _TOOL_ICONS = {
     "vault_search": "🔎",
 }
 
+# "<icon> " prefix per tool, built once so formatters just concatenate
+_TOOL_PREFIX = {name: f"{icon} " for name, icon in _TOOL_ICONS.items()}
 
-def _format_tool_action(func_name: str, args: dict, result: str) -> str:
-    """Format a single tool action for the user summary."""
-    icon = _TOOL_ICONS.get(func_name, "🔧")
-    
-    # Compact human-friendly descriptions
-    if func_name == "show_face":
-        mood = args.get("mood", "?")
-        text = args.get("text", "")
-        return f"{icon} face: {mood}" + (f' "{text[:30]}"' if text else "")
-    
-    elif func_name == "remember_fact":
-        fact = args.get("content", args.get("fact", ""))[:40]
-        return f"{icon} remembered: \"{fact}\""
-    
-    elif func_name == "recall_facts":
-        q = args.get("query", "all")
-        return f"{icon} searched memory: \"{q}\""
-    
-    elif func_name == "recall_messages":
-        n = args.get("limit", 20)
-        return f"{icon} read last {n} messages"
-    
-    elif func_name == "execute_bash":
-        cmd = args.get("command", "")[:40]
-        ok = "✓" if "Error" not in result else "✗"
-        return f"{icon} bash: `{cmd}` {ok}"
-    
-    elif func_name == "read_file":
-        path = args.get("path", "?").split("/")[-1]
-        return f"{icon} read: {path}"
-    
-    elif func_name == "write_file":
-        path = args.get("path", "?").split("/")[-1]
-        ok = "✓" if "Error" not in result else "✗"
-        return f"{icon} wrote: {path} {ok}"
-    
-    elif func_name == "git_command":
-        cmd = args.get("command", "?")[:40]
-        ok = "✓" if "Error" not in result else "✗"
-        return f"{icon} git: `{cmd}` {ok}"
-    
-    elif func_name == "health_check":
-        return f"{icon} health check"
 
-    elif func_name == "log_error":
-        msg = (args.get("message") or "?")[:30]
-        return f"{icon} error log: {msg}"
+def _ok_mark(ok: bool) -> str:
+    return "✓" if ok else "✗"
 
-    elif func_name == "safe_restart":
-        return f"{icon} restart"
 
-    elif func_name == "vault_write":
-        title = args.get("title", "")
-        note_type = args.get("note_type", "memo")
-        return f"{icon} saved vault note: \"{title[:40]}\" ({note_type})"
+# Compact human-friendly descriptions, one formatter per tool: (prefix, args, ok) -> str
+def _fmt_show_face(prefix: str, args: dict, ok: bool) -> str:
+    mood = args.get("mood", "?")
+    text = args.get("text", "")
+    return f"{prefix}face: {mood}" + (f' "{text[:30]}"' if text else "")
 
-    elif func_name == "vault_read":
-        path = args.get("path", "")
-        return f"{icon} read vault file: {path}"
 
-    elif func_name == "vault_list":
-        path = args.get("path", ".")
-        return f"{icon} listed vault: {path}"
+def _fmt_remember_fact(prefix: str, args: dict, ok: bool) -> str:
+    fact = args.get("content", args.get("fact", ""))[:40]
+    return f"{prefix}remembered: \"{fact}\""
 
-    elif func_name == "vault_search":
-        query = args.get("query", "")
-        return f"{icon} searched vault: \"{query}\""
-    
-    else:
-        # Generic format
-        args_str = ", ".join(f"{k}={str(v)[:20]}" for k, v in list(args.items())[:2])
-        ok = "✓" if "Error" not in result else "✗"
-        return f"{icon} {func_name}({args_str}) {ok}"
+
+def _fmt_recall_facts(prefix: str, args: dict, ok: bool) -> str:
+    q = args.get("query", "all")
+    return f"{prefix}searched memory: \"{q}\""
+
+
+def _fmt_recall_messages(prefix: str, args: dict, ok: bool) -> str:
+    n = args.get("limit", 20)
+    return f"{prefix}read last {n} messages"
+
+
+def _fmt_execute_bash(prefix: str, args: dict, ok: bool) -> str:
+    cmd = args.get("command", "")[:40]
+    return f"{prefix}bash: `{cmd}` {_ok_mark(ok)}"
+
+
+def _fmt_read_file(prefix: str, args: dict, ok: bool) -> str:
+    path = args.get("path", "?").rpartition("/")[2]
+    return f"{prefix}read: {path}"
+
+
+def _fmt_write_file(prefix: str, args: dict, ok: bool) -> str:
+    path = args.get("path", "?").rpartition("/")[2]
+    return f"{prefix}wrote: {path} {_ok_mark(ok)}"
+
+
+def _fmt_git_command(prefix: str, args: dict, ok: bool) -> str:
+    cmd = args.get("command", "?")[:40]
+    return f"{prefix}git: `{cmd}` {_ok_mark(ok)}"
+
+
+def _fmt_health_check(prefix: str, args: dict, ok: bool) -> str:
+    return f"{prefix}health check"
+
+
+def _fmt_log_error(prefix: str, args: dict, ok: bool) -> str:
+    msg = (args.get("message") or "?")[:30]
+    return f"{prefix}error log: {msg}"
+
+
+def _fmt_safe_restart(prefix: str, args: dict, ok: bool) -> str:
+    return f"{prefix}restart"
+
+
+def _fmt_vault_write(prefix: str, args: dict, ok: bool) -> str:
+    title = args.get("title", "")
+    note_type = args.get("note_type", "memo")
+    return f"{prefix}saved vault note: \"{title[:40]}\" ({note_type})"
+
+
+def _fmt_vault_read(prefix: str, args: dict, ok: bool) -> str:
+    path = args.get("path", "")
+    return f"{prefix}read vault file: {path}"
+
+
+def _fmt_vault_list(prefix: str, args: dict, ok: bool) -> str:
+    path = args.get("path", ".")
+    return f"{prefix}listed vault: {path}"
+
+
+def _fmt_vault_search(prefix: str, args: dict, ok: bool) -> str:
+    query = args.get("query", "")
+    return f"{prefix}searched vault: \"{query}\""
+
+
+def _fmt_generic(prefix: str, func_name: str, args: dict, ok: bool) -> str:
+    args_str = ", ".join(f"{k}={str(v)[:20]}" for k, v in islice(args.items(), 2))
+    return f"{prefix}{func_name}({args_str}) {_ok_mark(ok)}"
+
+
+_FORMATTERS = {
+    "show_face": _fmt_show_face,
+    "remember_fact": _fmt_remember_fact,
+    "recall_facts": _fmt_recall_facts,
+    "recall_messages": _fmt_recall_messages,
+    "execute_bash": _fmt_execute_bash,
+    "read_file": _fmt_read_file,
+    "write_file": _fmt_write_file,
+    "git_command": _fmt_git_command,
+    "health_check": _fmt_health_check,
+    "log_error": _fmt_log_error,
+    "safe_restart": _fmt_safe_restart,
+    "vault_write": _fmt_vault_write,
+    "vault_read": _fmt_vault_read,
+    "vault_list": _fmt_vault_list,
+    "vault_search": _fmt_vault_search,
+}
+
+
+def _format_tool_action(func_name: str, args: dict, ok: bool) -> str:
+    """Format a single tool action for the user summary."""
+    prefix = _TOOL_PREFIX.get(func_name, "🔧 ")
+    formatter = _FORMATTERS.get(func_name)
+    if formatter is None:
+        return _fmt_generic(prefix, func_name, args, ok)
+    return formatter(prefix, args, ok)
+
+
+# Tools left out of the footer — faces are visual, the user sees them on the display.
+# Filtered when actions are recorded, so the footer only ever sees visible ones.
+_FOOTER_HIDDEN_TOOLS = frozenset({"show_face"})
 
 
 def _build_tool_footer(actions: list[str]) -> str:
-    """Build compact tool usage footer inside a code block."""
-    # Skip show_face — it's visual, user sees it on the display
-    visible = [a for a in actions if not a.strip().startswith("🎨 face:") and not a.strip().startswith("😎 face:")]
-    
-    if not visible:
+    """Build compact tool usage footer inside a code block (actions are pre-filtered)."""
+    if not actions:
         return ""
-    
-    lines = ["```", f"🔧 Tool usage ({len(visible)}):"]
-    for action in visible:
-        # Escape backticks to avoid breaking the code block
-        safe = (action or "").replace("`", "'")
-        lines.append(f"  {safe}")
+    lines = ["```", f"🔧 Tool usage ({len(actions)}):"]
+    # Escape backticks to avoid breaking the code block
+    lines.extend("  " + action.replace("`", "'") for action in actions)
     lines.append("```")
     return "\n".join(lines)
 
 
+# Marker the bot handlers split on to render the footer separately
+TOOL_FOOTER_SEPARATOR = "\n\n__TOOL_FOOTER__\n"
+
+
+def _with_tool_footer(text: str, actions: list[str]) -> str:
+    """Append the tool usage footer to a reply (unchanged if nothing visible ran)."""
+    footer = _build_tool_footer(actions) if actions else ""
+    return "".join((text, TOOL_FOOTER_SEPARATOR, footer)) if footer else text
+
+
 # ============================================================
 # CONNECTOR
 # ============================================================
 
+# Only the newest N tool results are resent in full each turn; older ones are cut
+TOOL_RESULTS_KEPT_FULL = 8
+TOOL_RESULT_STUB_CHARS = 200
+
+
+def _compact_tool_message(message: dict) -> None:
+    """Shrink an old tool result in place (tool_call_id/name stay for the API)."""
+    content = message["content"]
+    if len(content) > TOOL_RESULT_STUB_CHARS:
+        message["content"] = content[:TOOL_RESULT_STUB_CHARS] + "\n… [truncated — older tool result]"
+
+
+# Read-only tools whose results are reused for a few seconds: name -> TTL (s).
+# Any other tool call may change what these return, so it clears the cache.
+# list_scheduled_tasks is left out: the scheduler changes jobs on its own as they fire.
+CACHEABLE_TOOL_TTL = {
+    "list_skills": 30,
+    "search_skills": 30,
+    "read_skill": 30,
+    "health_check": 10,
+}
+
+# (tool name, canonical args JSON) -> (monotonic time, result)
+_tool_result_cache: dict[tuple[str, str], tuple[float, str]] = {}
+
+
+async def _run_tool(func_name: str, func, args: dict, args_key: str):
+    """Run a validated tool call off the event loop, serving repeat reads from the cache."""
+    ttl = CACHEABLE_TOOL_TTL.get(func_name)
+    if ttl is None:
+        _tool_result_cache.clear()
+    else:
+        hit = _tool_result_cache.get((func_name, args_key))
+        if hit and time.monotonic() - hit[0] < ttl:
+            log.debug(f"[LiteLLM] {func_name}: cached result")
+            return hit[1]
+    try:
+        result = await asyncio.to_thread(functools.partial(func, **args))
+    except Exception as e:
+        result = f"Error executing {func_name}: {e}"
+        log.error(f"[LiteLLM] {result}")
+        return result
+    if ttl is not None and type(result) is str and not result.startswith("Error"):
+        _tool_result_cache[(func_name, args_key)] = (time.monotonic(), result)
+    return result
+
+
+_acompletion = None  # litellm.acompletion, imported on first call (heavy import)
+
+
+def _get_acompletion():
+    """Import litellm once and cache acompletion."""
+    global _acompletion
+    if _acompletion is None:
+        try:
+            from litellm import acompletion
+        except ImportError:
+            raise LLMError("litellm not installed")
+        _acompletion = acompletion
+    return _acompletion
+
+
 _ACTIVE_MODEL_FILE = None  # Set lazily to avoid circular import
 
+# System prompts per user message: (built at monotonic time, prompt). It embeds live
+# stats/facts, so entries only live a short while — enough for cron/heartbeat repeats.
+SYSTEM_PROMPT_TTL = 30.0
+SYSTEM_PROMPT_CACHE_SIZE = 32
+_system_prompt_cache: dict[str, tuple[float, str]] = {}
+
 
 def _active_model_path() -> Path:
     global _ACTIVE_MODEL_FILE
     if _ACTIVE_MODEL_FILE is None:
-        from config import DATA_DIR
         _ACTIVE_MODEL_FILE = DATA_DIR / "active_model.json"
     return _ACTIVE_MODEL_FILE
 
@@ -1270,7 +1775,7 @@ def _load_active_model() -> Optional[dict]:
     try:
         p = _active_model_path()
         if p.exists():
-            return json.loads(p.read_text())
+            return _json_loads(p.read_bytes())
     except Exception as e:
         log.warning(f"Could not load active_model.json: {e}")
     return None
@@ -1280,7 +1785,7 @@ def _save_active_model(model: str, api_base: Optional[str]) -> None:
     try:
         p = _active_model_path()
         p.parent.mkdir(parents=True, exist_ok=True)
-        p.write_text(json.dumps({"model": model, "api_base": api_base}, indent=2))
+        p.write_bytes(_json_dumps_pretty({"model": model, "api_base": api_base}))
     except Exception as e:
         log.warning(f"Could not save active_model.json: {e}")
 
@@ -1291,7 +1796,6 @@ class LiteLLMConnector(LLMConnector):
     name = "litellm"
 
     def __init__(self, model: str = None, api_base: str = None):
-        from config import DEFAULT_LITE_PRESET, LLM_PRESETS, GEMINI_API_BASE
         if model is not None:
             self.model = model
             self.api_base = api_base
@@ -1321,8 +1825,16 @@ class LiteLLMConnector(LLMConnector):
         Load system prompt — same source as Claude CLI.
         Uses shared prompts.py for consistency.
         """
-        from llm.prompts import build_system_context
-        return build_system_context(user_message)
+        now = time.monotonic()
+        cached = _system_prompt_cache.get(user_message)
+        if cached and now - cached[0] < SYSTEM_PROMPT_TTL:
+            return cached[1]
+        prompt = build_system_context(user_message)
+        if len(_system_prompt_cache) >= SYSTEM_PROMPT_CACHE_SIZE:
+            # Drop the oldest entry (dicts keep insertion order)
+            _system_prompt_cache.pop(next(iter(_system_prompt_cache)))
+        _system_prompt_cache[user_message] = (now, prompt)
+        return prompt
     
     async def call(
         self, 
@@ -1333,10 +1845,7 @@ class LiteLLMConnector(LLMConnector):
     ) -> str:
         """Call LiteLLM with tool support."""
         
-        try:
-            from litellm import acompletion
-        except ImportError:
-            raise LLMError("litellm not installed")
+        acompletion = _get_acompletion()
         
         # Build messages
         messages = []
@@ -1358,77 +1867,95 @@ class LiteLLMConnector(LLMConnector):
         MAX_TOOL_CALLS = 150  # Safety limit
         
         # Loop detection
-        recent_tools = []  # Track last N tool calls
         MAX_REPEAT = 3     # If same tool called 3x in row, summarize
+        last_call = None   # (tool, args fingerprint) of the previous call
+        repeat_count = 0   # How many times in a row last_call was made
         
         # Tool usage tracking for user transparency
         tool_actions = []
         
+        # Positions of tool results in messages, oldest first (for compaction)
+        tool_msg_indices = deque()
+        # Where the newest assistant turn's tool results start — those are not yet seen
+        latest_batch_start = 0
+        
+        # Request kwargs are the same every turn (messages grows in place) — build once
+        kwargs = {
+            "model": self.model,
+            "messages": messages,
+            "timeout": LLM_TIMEOUT,
+        }
+        if ENABLE_LITELLM_TOOLS:
+            # Shared module-level list (or a filtered copy) — never mutated
+            tools = _filter_tools(allowed_tool_names)
+            if tools:
+                kwargs["tools"] = tools
+                kwargs["tool_choice"] = "auto"
+            else:
+                kwargs["tool_choice"] = "none"
+        else:
+            kwargs["tool_choice"] = "none"
+        
+        # Use instance api_base if set, otherwise potentially fall back to env or default
+        if self.api_base:
+            kwargs["api_base"] = self.api_base
+        
         for turn in range(MAX_TURNS):
+            # Keep the request payload from growing quadratically: results from earlier
+            # turns shrink to a stub once there are too many; the newest batch goes in full
+            while (
+                len(tool_msg_indices) > TOOL_RESULTS_KEPT_FULL
+                and tool_msg_indices[0] < latest_batch_start
+            ):
+                _compact_tool_message(messages[tool_msg_indices.popleft()])
+            
             try:
-                kwargs = {
-                    "model": self.model,
-                    "messages": messages,
-                    "timeout": LLM_TIMEOUT,
-                }
-                if ENABLE_LITELLM_TOOLS:
-                    tools = _filter_tools(allowed_tool_names)
-                    if tools:
-                        kwargs["tools"] = tools
-                        kwargs["tool_choice"] = "auto"
-                    else:
-                        kwargs["tool_choice"] = "none"
-                else:
-                    kwargs["tool_choice"] = "none"
-                
-                # Use instance api_base if set, otherwise potentially fall back to env or default
-                if self.api_base:
-                     kwargs["api_base"] = self.api_base
-                
                 response = await acompletion(**kwargs)
                 
                 msg = response.choices[0].message
+                tool_calls = getattr(msg, "tool_calls", None)
                 messages.append({
                     "role": "assistant",
                     "content": msg.content,
-                    "tool_calls": getattr(msg, "tool_calls", None)
+                    "tool_calls": tool_calls
                 })
+                latest_batch_start = len(messages)
                 
-                if msg.tool_calls:
-                    for tool_call in msg.tool_calls:
+                if tool_calls:
+                    for tool_call in tool_calls:
                         # Safety: limit total tool calls
                         tool_calls_count += 1
                         if tool_calls_count > MAX_TOOL_CALLS:
                             log.warning(f"[LiteLLM] Tool call limit reached ({MAX_TOOL_CALLS})")
-                            msg = "Error: Too many tool calls. Stopping for safety."
-                            if tool_actions:
-                                footer = _build_tool_footer(tool_actions)
-                                msg = f"{msg}\n\n__TOOL_FOOTER__\n{footer}"
-                            return msg
+                            return _with_tool_footer("Error: Too many tool calls. Stopping for safety.", tool_actions)
                         
+                        # Interned like the literal TOOL_MAP/_FORMATTERS keys, so lookups match by identity.
+                        # A missing/odd name must still reach the "Unknown tool" path, not raise.
                         func_name = tool_call.function.name
+                        func_name = sys.intern(func_name) if isinstance(func_name, str) else str(func_name or "")
                         
                         # Parse arguments safely
                         try:
                             raw_args = tool_call.function.arguments or "{}"
-                            args = json.loads(raw_args)
+                            args = _json_loads(raw_args)
                             if not isinstance(args, dict):
                                 args = {}
-                        except json.JSONDecodeError as e:
+                        except json.JSONDecodeError as e:  # orjson's error subclasses this
                             log.warning(f"[LiteLLM] Bad JSON from {func_name}: {e}")
                             args = {}
                         
                         log.info(f"[LiteLLM] Turn {turn+1}: {func_name}({list(args.keys())})")
                         
                         # Loop detection: same tool + same args = real loop. Same tool + different args (e.g. bash cmd1, bash cmd2) = OK
-                        args_fingerprint = json.dumps(args, sort_keys=True)[:200] if args else ""
-                        call_signature = (func_name, args_fingerprint)
-                        recent_tools.append(call_signature)
-                        if len(recent_tools) > MAX_REPEAT:
-                            recent_tools.pop(0)
+                        args_key = json.dumps(args, sort_keys=True) if args else ""
+                        call_signature = (func_name, args_key[:200])
+                        if call_signature == last_call:
+                            repeat_count += 1
+                        else:
+                            last_call, repeat_count = call_signature, 1
                         
                         # Only nudge when the exact same call (tool + args) is repeated
-                        if len(recent_tools) >= MAX_REPEAT and len(set(recent_tools)) == 1:
+                        if repeat_count >= MAX_REPEAT:
                             log.warning(f"[LiteLLM] Loop detected: same {func_name}(...) called {MAX_REPEAT}x in a row")
                             messages.append({
                                 "role": "user",
@@ -1437,50 +1964,48 @@ class LiteLLMConnector(LLMConnector):
                                     "Pause. Think: what did the previous results show? Try a different tool, different arguments, or answer from what you have. Do not repeat the exact same call."
                                 )
                             })
-                            recent_tools = []
+                            last_call, repeat_count = None, 0
                             continue
                         
                         # Execute tool
                         func = TOOL_MAP.get(func_name)
-                        if func:
-                            try:
-                                result = await asyncio.to_thread(functools.partial(func, **args))
-                            except TypeError as e:
-                                # Wrong arguments
-                                result = f"Error: Invalid arguments for {func_name}: {e}"
-                                log.warning(f"[LiteLLM] {result}")
-                            except Exception as e:
-                                result = f"Error executing {func_name}: {e}"
-                                log.error(f"[LiteLLM] {result}")
+                        if func is None:
+                            result = f"Unknown tool: {func_name}. Available: {_TOOL_NAMES_STR}"
                         else:
-                            result = f"Unknown tool: {func_name}. Available: {', '.join(TOOL_MAP.keys())}"
+                            # Argument shape is checked up front, so a TypeError from
+                            # the call itself is a tool bug, not bad model output
+                            arg_error = _validate_tool_args(func_name, args)
+                            if arg_error:
+                                result = arg_error
+                                log.warning(f"[LiteLLM] {result}")
+                            else:
+                                result = await _run_tool(func_name, func, args, args_key)
+                        
+                        # Convert once; nothing below looks past the first 4000 chars
+                        result_str = (result if type(result) is str else str(result))[:4000]
                         
                         # Log result preview
-                        result_preview = str(result)[:100]
-                        log.debug(f"[LiteLLM] {func_name} -> {result_preview}...")
+                        log.debug(f"[LiteLLM] {func_name} -> {result_str[:100]}...")
                         
                         # Track for user-visible summary
-                        tool_actions.append(_format_tool_action(func_name, args, str(result)[:200]))
+                        if func_name not in _FOOTER_HIDDEN_TOOLS:
+                            # Same test as before (an "Error" near the start), without slicing a copy
+                            ok = result_str.find("Error", 0, 200) == -1
+                            tool_actions.append(_format_tool_action(func_name, args, ok))
                         
                         messages.append({
                             "role": "tool",
                             "tool_call_id": tool_call.id,
                             "name": func_name,
-                            "content": str(result)[:4000]
+                            "content": result_str
                         })
+                        tool_msg_indices.append(len(messages) - 1)
                 else:
                     # No tool calls = final response — clear any rate limit
-                    from llm.rate_limits import clear_limit
                     clear_limit("litellm")
                     
-                    final = msg.content or "(empty response)"
-                    
                     # Append tool usage summary if any tools were called
-                    if tool_actions:
-                        footer = _build_tool_footer(tool_actions)
-                        final = f"{final}\n\n__TOOL_FOOTER__\n{footer}"
-                    
-                    return final
+                    return _with_tool_footer(msg.content or "(empty response)", tool_actions)
                     
             except Exception as e:
                 err_str = str(e)
@@ -1488,7 +2013,6 @@ class LiteLLMConnector(LLMConnector):
                 
                 # Handle rate limits smartly
                 if "429" in err_str or "RateLimitError" in err_str or "rate" in err_str.lower():
-                    from llm.rate_limits import record_rate_limit, should_auto_retry
                     record_rate_limit("litellm", err_str)
                     
                     # Auto-retry if short limit (< 90s)
@@ -1499,15 +2023,7 @@ class LiteLLMConnector(LLMConnector):
                         continue  # Retry the same turn
                 
                 # Don't crash on API errors, return error message
-                msg = f"Error: LLM API failed: {err_str[:200]}"
-                if tool_actions:
-                    footer = _build_tool_footer(tool_actions)
-                    msg = f"{msg}\n\n__TOOL_FOOTER__\n{footer}"
-                return msg
+                return _with_tool_footer(f"Error: LLM API failed: {err_str[:200]}", tool_actions)
         
         log.warning(f"[LiteLLM] Max turns ({MAX_TURNS}) reached, {tool_calls_count} tool calls")
-        msg = "I made too many attempts. Please try a simpler request."
-        if tool_actions:
-            footer = _build_tool_footer(tool_actions)
-            msg = f"{msg}\n\n__TOOL_FOOTER__\n{footer}"
-        return msg
+        return _with_tool_footer("I made too many attempts. Please try a simpler request.", tool_actions)
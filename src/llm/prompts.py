@@ -5,7 +5,9 @@ Single source of truth: .workspace/ files
 Both Claude CLI and LiteLLM use the same files.
 """
 
+import functools
 from pathlib import Path
+from typing import Optional
 
 from config import PROJECT_DIR, WORKSPACE_DIR, CUSTOM_FACES_PATH, BOT_LANGUAGE
 from hardware.system import get_stats_string
@@ -20,8 +22,27 @@ _LANG_NAMES = {
 }
 
 
+# path -> (st_mtime_ns, text); prompt files are re-read only after they change
+_file_cache: dict[Path, tuple[int, str]] = {}
+
+
+def _read_text_cached(path: Path) -> Optional[str]:
+    """Read a prompt file, reusing the last read while its mtime is unchanged. None if missing."""
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _file_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    text = path.read_text()
+    _file_cache[path] = (mtime, text)
+    return text
+
+
+@functools.cache
 def _language_directive() -> str:
-    """Build a strong language instruction from BOT_LANGUAGE."""
+    """Build a strong language instruction from BOT_LANGUAGE (fixed per process, built once)."""
     code = (BOT_LANGUAGE or "").strip().lower()
     if not code:
         return ""
@@ -37,10 +58,11 @@ def _language_directive() -> str:
 
 def _load_custom_faces_list() -> str:
     """Load list of custom faces for system prompt."""
-    if not CUSTOM_FACES_PATH.exists():
-        return ""
     try:
-        faces = json.loads(CUSTOM_FACES_PATH.read_text())
+        raw = _read_text_cached(CUSTOM_FACES_PATH)
+        if raw is None:
+            return ""
+        faces = json.loads(raw)
         if not faces:
             return ""
         return "Custom Moods: " + ", ".join(faces.keys())
@@ -52,43 +74,36 @@ def load_bot_instructions() -> str:
     """
     Load BOT_INSTRUCTIONS.md — the main system prompt.
     """
-    workspace_file = WORKSPACE_DIR / "BOT_INSTRUCTIONS.md"
-    if workspace_file.exists():
-        return workspace_file.read_text()
-    
-    templates_file = PROJECT_DIR / "templates" / "BOT_INSTRUCTIONS.md"
-    if templates_file.exists():
-        return templates_file.read_text()
+    text = _load_workspace_file("BOT_INSTRUCTIONS.md")
+    if text is not None:
+        return text
     
     return """You are an AI assistant on Raspberry Pi Zero 2W.
 Use FACE: <mood> to express emotions. Be concise and expressive."""
 
 
-def _load_workspace_file(name: str) -> str:
-    """Load a file from .workspace/ (fallback to templates/)."""
-    ws = WORKSPACE_DIR / name
-    if ws.exists():
-        return ws.read_text()
-    tmpl = PROJECT_DIR / "templates" / name
-    if tmpl.exists():
-        return tmpl.read_text()
-    return ""
+def _load_workspace_file(name: str) -> Optional[str]:
+    """Load a file from .workspace/ (fallback to templates/). None if neither exists."""
+    text = _read_text_cached(WORKSPACE_DIR / name)
+    if text is None:
+        text = _read_text_cached(PROJECT_DIR / "templates" / name)
+    return text
 
 
 def load_architecture() -> str:
-    return _load_workspace_file("ARCHITECTURE.md")
+    return _load_workspace_file("ARCHITECTURE.md") or ""
 
 def load_tools() -> str:
-    return _load_workspace_file("TOOLS.md")
+    return _load_workspace_file("TOOLS.md") or ""
 
 def load_soul() -> str:
-    return _load_workspace_file("SOUL.md")
+    return _load_workspace_file("SOUL.md") or ""
 
 def load_identity() -> str:
-    return _load_workspace_file("IDENTITY.md")
+    return _load_workspace_file("IDENTITY.md") or ""
 
 def load_vault() -> str:
-    return _load_workspace_file("VAULT.md")
+    return _load_workspace_file("VAULT.md") or ""
 
 def build_vault_context() -> str:
     vault = load_vault()
@@ -208,21 +208,21 @@ def load_all_skills() -> list[Skill]:
     seen_names = set()
     
     for skills_dir in SKILLS_DIRS:
-        if not skills_dir.exists():
+        try:
+            it = os.scandir(skills_dir)
+        except OSError:
             continue
         
-        for item in skills_dir.iterdir():
-            if not item.is_dir():
-                continue
-            
-            # Optimization: Skip parsing if not in active list
-            if item.name not in active_skills:
-                continue
-            
-            skill = load_skill(item)
-            if skill and skill.name not in seen_names:
-                skills.append(skill)
-                seen_names.add(skill.name)
+        with it:
+            for entry in it:
+                # Optimization: Skip parsing if not in active list (name check needs no stat)
+                if entry.name not in active_skills or not entry.is_dir():
+                    continue
+                
+                skill = load_skill(Path(entry.path))
+                if skill and skill.name not in seen_names:
+                    skills.append(skill)
+                    seen_names.add(skill.name)
     
     return skills
 
@@ -310,38 +310,88 @@ def search_skill_catalog(query: str) -> str:
     return f"No skills found matching '{query}'. Try broader terms or check openclaw-skills/CATALOG.md directly."
 
 
+# (mtime_ns of each SKILLS_DIRS entry, {skill name: SKILL.md path}) — see _get_skill_index
+_skill_index: Optional[tuple[tuple[int, ...], dict[str, Path]]] = None
+
+
+def _get_skill_index() -> dict[str, Path]:
+    """
+    Map skill name -> SKILL.md path (earlier SKILLS_DIRS win).
+    Rebuilt with one scandir per dir whenever a skills dir's mtime changes.
+    Only paths are cached: SKILL.md itself is read on every lookup, so in-place
+    edits show up immediately and need no reload or per-file mtime in the key.
+    """
+    global _skill_index
+    mtimes = []
+    for skills_dir in SKILLS_DIRS:
+        try:
+            mtimes.append(skills_dir.stat().st_mtime_ns)
+        except OSError:
+            mtimes.append(0)
+    mtimes = tuple(mtimes)
+    
+    if _skill_index is None or _skill_index[0] != mtimes:
+        index = {}
+        for skills_dir in SKILLS_DIRS:
+            try:
+                it = os.scandir(skills_dir)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    skill_md = os.path.join(entry.path, "SKILL.md")
+                    if entry.name not in index and entry.is_dir() and os.path.isfile(skill_md):
+                        index[entry.name] = Path(skill_md)
+        _skill_index = (mtimes, index)
+    return _skill_index[1]
+
+
+def _with_compat_warning(skills_dir: Path, content: str) -> str:
+    """Append the compatibility warning to openclaw-skills content."""
+    if "openclaw-skills" in str(skills_dir):
+        warning = (
+            "\n\n---\n"
+            "⚠️ **COMPATIBILITY WARNING**: This skill is from openclaw-skills/ "
+            "and may not work on Raspberry Pi. Check requirements above.\n"
+            "---\n"
+        )
+        return content + warning
+    
+    return content
+
+
 def get_skill_content(skill_name: str) -> str:
     """
     Read the full content of a skill's SKILL.md.
     Works for both gotchi-skills and openclaw-skills.
     """
+    skill_path = _get_skill_index().get(skill_name)
+    if skill_path is not None:
+        try:
+            return _with_compat_warning(skill_path.parent.parent, skill_path.read_text(encoding='utf-8'))
+        except FileNotFoundError:
+            pass  # Removed since the index was built — probe below
+    
+    # Index miss: probe directly (a SKILL.md added inside an existing dir doesn't bump its parent's mtime)
     for skills_dir in SKILLS_DIRS:
         skill_path = skills_dir / skill_name / "SKILL.md"
         if skill_path.exists():
-            content = skill_path.read_text(encoding='utf-8')
-            
-            # Add compatibility warning for openclaw-skills
-            if "openclaw-skills" in str(skills_dir):
-                warning = (
-                    "\n\n---\n"
-                    "⚠️ **COMPATIBILITY WARNING**: This skill is from openclaw-skills/ "
-                    "and may not work on Raspberry Pi. Check requirements above.\n"
-                    "---\n"
-                )
-                return content + warning
-            
-            return content
+            return _with_compat_warning(skills_dir, skill_path.read_text(encoding='utf-8'))
     
     return f"Skill '{skill_name}' not found. Use search_skills() to find available skills."
 
 
 def list_all_skill_names() -> list[str]:
     """List all available skill names (for autocomplete/discovery)."""
-    names = []
+    names = set()
     for skills_dir in SKILLS_DIRS:
-        if not skills_dir.exists():
+        try:
+            it = os.scandir(skills_dir)
+        except OSError:
             continue
-        for item in skills_dir.iterdir():
-            if item.is_dir() and (item / "SKILL.md").exists():
-                names.append(item.name)
-    return sorted(set(names))
+        with it:
+            for entry in it:
+                # DirEntry.is_dir() is answered from the dirent type, no extra stat
+                if entry.is_dir() and os.path.isfile(os.path.join(entry.path, "SKILL.md")):
+                    names.add(entry.name)
+    return sorted(names)
@@ -1,94 +1,111 @@
 #!/usr/bin/env python3
+import math
+import shutil
 import subprocess
 import os
 import sys
 
-def check(name, cmd):
+THERMAL_ZONE = "/sys/class/thermal/thermal_zone0/temp"
+
+
+def check(name, cmd, timeout=10):
     try:
-        output = subprocess.check_output(cmd, shell=True, text=True, stderr=subprocess.STDOUT).strip()
+        output = subprocess.check_output(
+            cmd, shell=True, text=True, stderr=subprocess.STDOUT, timeout=timeout
+        ).strip()
         return True, output
     except subprocess.CalledProcessError as e:
         return False, e.output.strip()
+    except subprocess.TimeoutExpired:
+        return False, f"{name}: timed out after {timeout}s"
 
-def main():
+
+def disk_used_pct(path="/"):
+    """Used space in percent, rounded up like df's Use% column."""
+    usage = shutil.disk_usage(path)
+    return math.ceil(usage.used * 100 / (usage.used + usage.free))
+
+
+def read_temp():
+    """SoC temperature in °C, or None if unavailable."""
+    try:
+        with open(THERMAL_ZONE) as f:
+            return int(f.read().strip()) / 1000
+    except (OSError, ValueError):
+        pass
+    # Fallback for boards without a thermal zone
+    ok, out = check("Temp", "vcgencmd measure_temp")
+    if ok:
+        try:
+            return float(out.replace("temp=", "").replace("'C", "").strip())
+        except ValueError:
+            pass
+    return None
+
+
+def run_checks():
+    """Run all checks in-process. Returns (report text, all_ok)."""
     bot_name = os.environ.get("BOT_NAME", "Gotchi")
-    print(f"=== 🏥 {bot_name} Doctor ===")
+    lines = [f"=== 🏥 {bot_name} Doctor ==="]
     all_ok = True
 
     # 1. Internet
     ok, out = check("Internet", "ping -c 1 google.com")
     if ok:
-        print("[✅] Internet: OK")
+        lines.append("[✅] Internet: OK")
     else:
-        print(f"[❌] Internet: FAIL\n{out}")
+        lines.append(f"[❌] Internet: FAIL\n{out}")
         all_ok = False
 
     # 2. Disk Space
-    ok, out = check("Disk", "df -h / | tail -1")
-    if ok:
-        try:
-            used_pct = int(out.split()[-2].replace("%", ""))
-            if used_pct < 90:
-                print(f"[✅] Disk: {used_pct}% used")
-            else:
-                print(f"[⚠️] Disk: {used_pct}% used (CRITICAL)")
-                all_ok = False
-        except Exception:
-            print(f"[❌] Disk: Failed to parse df output\n{out}")
+    try:
+        used_pct = disk_used_pct("/")
+        if used_pct < 90:
+            lines.append(f"[✅] Disk: {used_pct}% used")
+        else:
+            lines.append(f"[⚠️] Disk: {used_pct}% used (CRITICAL)")
             all_ok = False
-    else:
-        print(f"[❌] Disk: FAIL\n{out}")
+    except OSError as e:
+        lines.append(f"[❌] Disk: FAIL\n{e}")
         all_ok = False
 
     # 3. Temperature
-    ok, out = check("Temp", "vcgencmd measure_temp")
-    if not ok:
-        # Fallback for non-vcgencmd environments
-        ok, out = check("Temp", "cat /sys/class/thermal/thermal_zone0/temp")
-        if ok:
-            try:
-                temp = float(out.strip()) / 1000
-                out = f"{temp}°C"
-            except Exception:
-                ok = False
-    if ok:
-        try:
-            temp = float(out.replace("temp=", "").replace("'C", "").replace("°C", "").strip())
-            if temp < 70:
-                print(f"[✅] Temp: {temp}°C")
-            else:
-                print(f"[⚠️] Temp: {temp}°C (HOT)")
-                all_ok = False
-        except Exception:
-            print(f"[❌] Temp: Failed to parse temperature\n{out}")
+    temp = read_temp()
+    if temp is not None:
+        if temp < 70:
+            lines.append(f"[✅] Temp: {temp}°C")
+        else:
+            lines.append(f"[⚠️] Temp: {temp}°C (HOT)")
             all_ok = False
     else:
-        print(f"[⚠️] Temp: Unavailable")
+        lines.append(f"[⚠️] Temp: Unavailable")
         all_ok = False
 
     # 4. Service Status
     ok, out = check("Service", "systemctl is-active gotchi-bot")
     if out == "active":
-        print("[✅] Service: Active")
+        lines.append("[✅] Service: Active")
     else:
-        print(f"[❌] Service: {out}")
+        lines.append(f"[❌] Service: {out}")
         all_ok = False
 
     # 5. Recent Errors
     ok, out = check("Logs", "journalctl -u gotchi-bot -n 50 | grep -i 'error' | tail -3")
     if not out:
-        print("[✅] Logs: No recent errors")
+        lines.append("[✅] Logs: No recent errors")
     else:
-        print(f"[⚠️] Logs (Recent Errors):\n{out}")
+        lines.append(f"[⚠️] Logs (Recent Errors):\n{out}")
         # Not marking as fail, just warning
 
-    print("==========================")
-    if all_ok:
-        print("Result: SYSTEM HEALTHY")
-        sys.exit(0)
-    else:
-        print("Result: ISSUES DETECTED")
-        sys.exit(1)
+    lines.append("==========================")
+    lines.append("Result: SYSTEM HEALTHY" if all_ok else "Result: ISSUES DETECTED")
+    return "\n".join(lines), all_ok
+
+
+def main():
+    report, all_ok = run_checks()
+    print(report)
+    sys.exit(0 if all_ok else 1)
 
 if __name__ == "__main__":
     main()